@@ -2,16 +2,35 @@
 """
 Simple script to run the Streamlit chat application
 """
-import subprocess
-import sys
 import os
-import time
+import socket
 import requests
+from requests.adapters import HTTPAdapter, Retry
+
+# Shared session so repeated checks reuse keep-alive connections
+session = requests.Session()
+session.mount("http://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
 
 def check_backend():
     """Check if the backend server is running"""
+    # Cheap TCP probe first: if nothing is listening on port 4000 we can
+    # bail out without paying for a full HTTP request
+    sock = socket.socket()
+    sock.settimeout(1.0)
+    try:
+        sock.connect(("localhost", 4000))
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+    # Something is listening; confirm it's actually our backend
     try:
-        response = requests.get("http://localhost:4000/api/health", timeout=5)
+        response = session.get("http://localhost:4000/api/health", timeout=5)
         return response.status_code == 200
     except:
         return False
@@ -33,13 +52,16 @@ def main():
     print("✅ Backend server detected")
     print("🚀 Starting Streamlit app...")
     
-    # Run Streamlit
+    # Run Streamlit in-process (skips spawning a second interpreter)
     try:
-        subprocess.run([
-            sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
-            "--server.port", "8501",
-            "--server.address", "localhost"
-        ], check=True)
+        from streamlit import config as st_config
+        from streamlit.web import bootstrap
+
+        st_config.set_option("server.port", 8501)
+        st_config.set_option("server.address", "localhost")
+
+        app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+        bootstrap.run(app_path, False, [], {})
     except KeyboardInterrupt:
         print("\n👋 Chat application stopped")
     except Exception as e:
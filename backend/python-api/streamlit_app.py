@@ -1,6 +1,11 @@
 import streamlit as st
+import aiohttp
 import requests
-import json
+from requests.adapters import HTTPAdapter, Retry
+import asyncio
+import gzip
+import orjson
+import threading
 import time
 from typing import Dict, List, Optional
 
@@ -15,6 +20,9 @@ st.set_page_config(
 # Backend API configuration
 API_BASE_URL = "http://localhost:4000/api"
 
+# Gzip request bodies larger than this (documentation JSON compresses well)
+GZIP_THRESHOLD = 16 * 1024
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -24,81 +32,267 @@ if "documentation" not in st.session_state:
     st.session_state.documentation = None
 if "conversation_history" not in st.session_state:
     st.session_state.conversation_history = []
+if "documentation_id" not in st.session_state:
+    st.session_state.documentation_id = None
+if "documentation_job" not in st.session_state:
+    st.session_state.documentation_job = None
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = None
+if "pending" not in st.session_state:
+    st.session_state.pending = []
+if "batch_unsupported" not in st.session_state:
+    st.session_state.batch_unsupported = False
+if "documentation_raw" not in st.session_state:
+    st.session_state.documentation_raw = None
+if "file_index" not in st.session_state:
+    st.session_state.file_index = []
+if "main_files" not in st.session_state:
+    st.session_state.main_files = []
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Shared HTTP session so all backend calls reuse keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    return session
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running on its own daemon thread, so any script or
+    fragment thread can dispatch coroutines to it safely"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro):
+    """Run a coroutine on the shared loop thread and wait for its result"""
+    # Prime the session from this thread first: creating it lazily inside a
+    # coroutine would block the loop thread waiting on itself
+    get_async_session()
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
 
+@st.cache_resource
+def get_async_session() -> aiohttp.ClientSession:
+    """Shared aiohttp session for the non-streaming backend calls"""
+    async def _make():
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=16))
+    return asyncio.run_coroutine_threadsafe(_make(), get_event_loop()).result()
+
+async def fetch_json(method: str, url: str, payload: Optional[Dict] = None, timeout: float = 30):
+    """Issue a backend request on the async session, returning (status, body)"""
+    headers = {}
+    body = None
+    if payload is not None:
+        body = payload if isinstance(payload, bytes) else orjson.dumps(payload)
+        headers["Content-Type"] = "application/json"
+        if len(body) > GZIP_THRESHOLD:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+    async with get_async_session().request(
+        method, url, data=body, headers=headers,
+        timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as response:
+        if response.status == 200:
+            return response.status, orjson.loads(await response.read())
+        return response.status, await response.text()
+
+def post_json(url: str, payload, **kwargs):
+    """POST a JSON payload (dict or pre-serialized bytes), gzipping large bodies"""
+    body = payload if isinstance(payload, bytes) else orjson.dumps(payload)
+    headers = {"Content-Type": "application/json"}
+    if len(body) > GZIP_THRESHOLD:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    return get_session().post(url, data=body, headers=headers, **kwargs)
+
+@st.cache_data(ttl=10, show_spinner=False)
 def test_backend_connection() -> bool:
-    """Test if the backend is running"""
+    """Test if the backend is running (cached so reruns skip the probe)"""
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-        return response.status_code == 200
+        status, _ = run_async(fetch_json("GET", f"{API_BASE_URL}/health", timeout=5))
+        return status == 200
     except:
         return False
 
 def connect_to_repository(repo_url: str) -> Optional[Dict]:
     """Connect to a GitHub repository"""
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/connect-repository",
-            json={"repoUrl": repo_url},
-            timeout=30
-        )
-        if response.status_code == 200:
-            return response.json()
+        # Fire the warm-up health probe and the connect call together so the
+        # wall time is the slower of the two instead of the sum; the probe's
+        # outcome is advisory, so its failure must not sink a good connect
+        async def _connect():
+            _, connect_result = await asyncio.gather(
+                fetch_json("GET", f"{API_BASE_URL}/health", timeout=5),
+                fetch_json(
+                    "POST",
+                    f"{API_BASE_URL}/connect-repository",
+                    {"repoUrl": repo_url},
+                    timeout=30
+                ),
+                return_exceptions=True
+            )
+            if isinstance(connect_result, BaseException):
+                raise connect_result
+            return connect_result
+
+        status, body = run_async(_connect())
+        if status == 200:
+            return body
         else:
-            st.error(f"Failed to connect to repository: {response.text}")
+            st.error(f"Failed to connect to repository: {body}")
             return None
     except Exception as e:
         st.error(f"Error connecting to repository: {str(e)}")
         return None
 
-def generate_documentation(repository: Dict) -> Optional[Dict]:
-    """Generate documentation for the repository"""
+def start_documentation(repository: Dict) -> Optional[Dict]:
+    """Request documentation generation. Backends with job support return
+    {"jobId": ...} right away; the in-repo synchronous backend blocks and
+    returns the finished {"success": ..., "documentation": ...} body, so the
+    timeout stays at the old 5 minutes to cover it"""
     try:
         payload = {
             "owner": repository["owner"],
             "repo": repository["name"],
             "branch": repository["defaultBranch"],
-            "fileStructure": repository["fileStructure"]
+            "fileStructure": repository["fileStructure"],
+            "async": True
         }
-        
-        response = requests.post(
+
+        status, body = run_async(fetch_json(
+            "POST",
             f"{API_BASE_URL}/generate-documentation",
-            json=payload,
-            timeout=300  # 5 minutes timeout for documentation generation
-        )
-        
-        if response.status_code == 200:
-            return response.json()
+            payload,
+            timeout=300
+        ))
+
+        if status == 200:
+            return body
         else:
-            st.error(f"Failed to generate documentation: {response.text}")
+            st.error(f"Failed to generate documentation: {body}")
             return None
     except Exception as e:
         st.error(f"Error generating documentation: {str(e)}")
         return None
 
-def chat_with_repository(message: str, repository: Dict, documentation: Dict, conversation_history: List) -> Optional[str]:
-    """Send a chat message about the repository"""
+def poll_documentation(job_id: str) -> Optional[Dict]:
+    """Poll the documentation job until it finishes, showing progress.
+
+    Pending polls report {"status": "pending", "filesDone", "filesTotal",
+    "progress"}; the terminal poll reports {"status": "complete"} plus the
+    same {"success": ..., "documentation": ...} fields as the synchronous
+    response, and that body is returned to the caller"""
+    progress_bar = st.progress(0.0)
+    delay = 1.0
+    deadline = time.monotonic() + 300  # same overall bound as the old blocking POST
+
+    while True:
+        if time.monotonic() > deadline:
+            st.error("Documentation generation timed out after 5 minutes")
+            return None
+
+        try:
+            http_status, status = run_async(fetch_json(
+                "GET",
+                f"{API_BASE_URL}/documentation-status/{job_id}",
+                timeout=10
+            ))
+        except Exception as e:
+            st.error(f"Error polling documentation job: {str(e)}")
+            return None
+
+        if http_status != 200:
+            st.error(f"Failed to poll documentation job: {status}")
+            return None
+
+        if status.get("status") == "failed":
+            st.error(f"Documentation generation failed: {status.get('error', 'unknown error')}")
+            return None
+
+        if status.get("status") == "complete":
+            progress_bar.progress(1.0)
+            return status
+
+        files_done = status.get("filesDone")
+        files_total = status.get("filesTotal")
+        if files_done is not None and files_total:
+            progress_bar.progress(
+                min(files_done / files_total, 1.0),
+                text=f"{files_done}/{files_total} files analyzed"
+            )
+        elif status.get("progress") is not None:
+            progress_bar.progress(min(status["progress"], 1.0))
+
+        # Back off from 1s to 5s between polls
+        time.sleep(delay)
+        delay = min(delay * 2, 5.0)
+
+def chat_with_repository(message: str, repository: Dict, documentation: Dict, conversation_history: List):
+    """Send a chat message about the repository, yielding reply chunks as they arrive"""
     try:
-        payload = {
-            "message": message,
-            "repository": repository,
-            "documentation": documentation["json"],
-            "conversationHistory": conversation_history
-        }
-        
-        response = requests.post(
+        if st.session_state.documentation_id:
+            # The backend keeps the docs and prior turns; send only handles
+            payload = {
+                "message": message,
+                "documentationId": st.session_state.documentation_id,
+                "conversationId": st.session_state.conversation_id,
+                "stream": True
+            }
+        else:
+            # Backend didn't return a documentation id; resend everything,
+            # but cap the history at the last 8 turns so old messages don't
+            # bloat every request (the full log stays in session state).
+            # The documentation bytes were serialized once at generation
+            # time, so splice them in verbatim instead of re-encoding the
+            # whole dict every turn.
+            doc_bytes = st.session_state.documentation_raw or orjson.dumps(documentation["json"])
+            payload = (
+                b'{"message":' + orjson.dumps(message)
+                + b',"repository":' + orjson.dumps(repository)
+                + b',"documentation":' + doc_bytes
+                + b',"conversationHistory":' + orjson.dumps(conversation_history[-16:])
+                + b',"stream":true}'
+            )
+
+        response = post_json(
             f"{API_BASE_URL}/chat-about-repository",
-            json=payload,
-            timeout=60
+            payload,
+            stream=True,
+            timeout=(5, 60)
         )
-        
-        if response.status_code == 200:
-            return response.json()["reply"]
-        else:
+
+        if response.status_code != 200:
             st.error(f"Chat failed: {response.text}")
-            return None
+            return
+
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            # Backend replied with plain JSON (no streaming support)
+            body = orjson.loads(response.content)
+            if body.get("conversationId"):
+                st.session_state.conversation_id = body["conversationId"]
+            yield body["reply"]
+            return
+
+        # Parse SSE "data:" frames and yield token deltas
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            event = orjson.loads(data)
+            if event.get("conversationId"):
+                st.session_state.conversation_id = event["conversationId"]
+            if event.get("delta"):
+                yield event["delta"]
     except Exception as e:
         st.error(f"Error in chat: {str(e)}")
-        return None
 
 def display_repository_info(repository: Dict):
     """Display repository information"""
@@ -143,34 +337,151 @@ def display_documentation_summary(documentation: Dict):
                 for comp in summary["mainComponents"]:
                     st.write(f"• {comp}")
 
-def suggest_questions(repository: Dict, documentation: Dict) -> List[str]:
-    """Generate suggested questions based on the repository"""
-    if not documentation or "json" not in documentation:
+def build_file_index(doc_data: Dict):
+    """Precompute the documented file names once per documentation, so the
+    suggestion logic never lowercases or scans them on a rerun"""
+    file_index = [(name, name.lower()) for name in doc_data.get("files", {})]
+    st.session_state.file_index = file_index
+    st.session_state.main_files = [
+        name for name, lowered in file_index
+        if any(keyword in lowered for keyword in ('main', 'index', 'app', 'server'))
+    ]
+
+def chat_body(extra: Dict) -> bytes:
+    """Build a chat POST body. With a documentation id only handles are
+    sent; otherwise the documentation bytes serialized at generation time
+    are spliced in verbatim instead of re-encoding the dict per message"""
+    if st.session_state.documentation_id:
+        return orjson.dumps(dict({
+            "documentationId": st.session_state.documentation_id,
+            "conversationId": st.session_state.conversation_id
+        }, **extra))
+
+    doc_bytes = st.session_state.documentation_raw or orjson.dumps(st.session_state.documentation["json"])
+    # orjson.dumps(extra)[1:] turns {"message": ...} into "message": ...}
+    return (
+        b'{"repository":' + orjson.dumps(st.session_state.repository)
+        + b',"documentation":' + doc_bytes
+        + b',"conversationHistory":' + orjson.dumps(st.session_state.conversation_history[-16:])
+        + b',' + orjson.dumps(extra)[1:]
+    )
+
+def chat_with_repository_batch(messages: List[str]) -> List[str]:
+    """Send queued chat messages in one backend call when the backend
+    supports it, falling back to one request per message otherwise.
+    Conversation history is maintained here as replies arrive"""
+    try:
+        # Only probe for batch support on handle-based backends: the
+        # in-repo server is single-message, and without a doc id the probe
+        # would carry the full documentation JSON just to collect a 400
+        if (len(messages) > 1 and st.session_state.documentation_id
+                and not st.session_state.batch_unsupported):
+            status, body = run_async(fetch_json(
+                "POST",
+                f"{API_BASE_URL}/chat-about-repository",
+                chat_body({"messages": messages}),
+                timeout=60
+            ))
+            if status == 200 and "replies" in body:
+                if body.get("conversationId"):
+                    st.session_state.conversation_id = body["conversationId"]
+                for question, reply in zip(messages, body["replies"]):
+                    st.session_state.conversation_history.append({"role": "user", "content": question})
+                    st.session_state.conversation_history.append({"role": "assistant", "content": reply})
+                return body["replies"]
+            # Remember the rejection so later flushes skip the probe
+            st.session_state.batch_unsupported = True
+
+        replies = []
+        for message in messages:
+            # Append before building the payload so each question sees the
+            # batch's earlier exchanges, matching the chat input path
+            st.session_state.conversation_history.append({"role": "user", "content": message})
+            status, body = run_async(fetch_json(
+                "POST",
+                f"{API_BASE_URL}/chat-about-repository",
+                chat_body({"message": message}),
+                timeout=60
+            ))
+            if status != 200:
+                st.error(f"Chat failed: {body}")
+                break
+            if body.get("conversationId"):
+                st.session_state.conversation_id = body["conversationId"]
+            replies.append(body["reply"])
+            st.session_state.conversation_history.append({"role": "assistant", "content": body["reply"]})
+        return replies
+    except Exception as e:
+        st.error(f"Error in chat: {str(e)}")
+        return []
+
+@st.cache_data(show_spinner=False)
+def suggest_questions(repo_key: str, doc_id: Optional[str], file_keys: tuple, main_files: tuple) -> List[str]:
+    """Generate suggested questions for a repository, cached per repo+doc"""
+    if not doc_id and not file_keys:
         return [
             "What does this repository do?",
             "How is the project structured?",
             "What are the main files?"
         ]
-    
-    doc_data = documentation["json"]
+
     suggestions = [
         "What does this repository do?",
         "How do I get started with this project?",
         "What are the main components?",
         "How is the code organized?",
     ]
-    
-    # Add file-specific suggestions
-    files = list(doc_data.get("files", {}).keys())
-    if files:
-        main_files = [f for f in files if any(keyword in f.lower() for keyword in ['main', 'index', 'app', 'server'])]
-        if main_files:
-            suggestions.append(f"What does {main_files[0]} do?")
-        if len(files) > 1:
-            suggestions.append(f"Explain the {files[1]} file")
-    
+
+    # Add file-specific suggestions from the precomputed index
+    if main_files:
+        suggestions.append(f"What does {main_files[0]} do?")
+    if len(file_keys) > 1:
+        suggestions.append(f"Explain the {file_keys[1]} file")
+
     return suggestions[:6]
 
+@st.fragment
+def render_chat():
+    """Chat history, input and clear button, isolated so a new message only
+    reruns this fragment instead of the whole script"""
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+    if prompt := st.chat_input("Ask a question about this repository..."):
+        # Add user message
+        user_message = {"role": "user", "content": prompt}
+        st.session_state.messages.append(user_message)
+        st.session_state.conversation_history.append(user_message)
+
+        # Display user message
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Get and display assistant response, streaming tokens as they arrive
+        with st.chat_message("assistant"):
+            response = st.write_stream(chat_with_repository(
+                prompt,
+                st.session_state.repository,
+                st.session_state.documentation,
+                st.session_state.conversation_history
+            ))
+
+            if response:
+                assistant_message = {"role": "assistant", "content": response}
+                st.session_state.messages.append(assistant_message)
+                st.session_state.conversation_history.append(assistant_message)
+            else:
+                st.error("Sorry, I couldn't process your question. Please try again.")
+
+    # Clear chat button
+    if st.session_state.messages:
+        if st.button("🗑️ Clear Chat"):
+            st.session_state.messages = []
+            st.session_state.conversation_history = []
+            st.session_state.conversation_id = None
+            st.rerun()
+
 # Main app layout
 st.title("🤖 Repository Chat Assistant")
 st.markdown("Ask questions about any GitHub repository after generating its documentation!")
@@ -204,6 +515,11 @@ with st.sidebar:
                 if result and result.get("success"):
                     st.session_state.repository = result["repository"]
                     st.session_state.documentation = None  # Reset documentation
+                    st.session_state.documentation_id = None
+                    st.session_state.documentation_raw = None
+                    st.session_state.conversation_id = None
+                    st.session_state.file_index = []
+                    st.session_state.main_files = []
                     st.success("✅ Repository connected!")
                     st.rerun()
         else:
@@ -222,13 +538,32 @@ with st.sidebar:
                 file_count = len(st.session_state.documentation["json"].get("files", {}))
                 st.info(f"📄 {file_count} files documented")
         else:
+            doc_result = None
             if st.button("Generate Documentation", type="secondary"):
                 with st.spinner("Generating documentation... This may take a few minutes."):
-                    doc_result = generate_documentation(st.session_state.repository)
-                    if doc_result and doc_result.get("success"):
-                        st.session_state.documentation = doc_result["documentation"]
-                        st.success("✅ Documentation generated!")
-                        st.rerun()
+                    result = start_documentation(st.session_state.repository)
+                if result and result.get("jobId"):
+                    st.session_state.documentation_job = result["jobId"]
+                elif result:
+                    # Synchronous backend: the POST already returned the docs
+                    doc_result = result
+
+            # A rerun mid-generation resumes polling the stored job
+            if st.session_state.documentation_job:
+                with st.status("Generating documentation... This may take a few minutes.", expanded=True):
+                    doc_result = poll_documentation(st.session_state.documentation_job)
+                st.session_state.documentation_job = None
+
+            if doc_result and doc_result.get("success"):
+                st.session_state.documentation = doc_result["documentation"]
+                st.session_state.documentation_id = doc_result["documentation"].get("id")
+                # Serialize the doc once; chat reuses these bytes verbatim
+                st.session_state.documentation_raw = orjson.dumps(
+                    doc_result["documentation"].get("json", {})
+                )
+                build_file_index(doc_result["documentation"].get("json", {}))
+                st.success("✅ Documentation generated!")
+                st.rerun()
 
 # Main content area
 if st.session_state.repository:
@@ -246,73 +581,43 @@ if st.session_state.repository:
         
         # Suggested questions
         with st.expander("💡 Suggested Questions", expanded=False):
-            suggestions = suggest_questions(st.session_state.repository, st.session_state.documentation)
+            # Hashable cache keys from the precomputed index: the doc dict
+            # itself would be slow to hash
+            if not st.session_state.file_index:
+                build_file_index(st.session_state.documentation.get("json", {}))
+            suggestions = suggest_questions(
+                st.session_state.repository["url"],
+                st.session_state.documentation_id,
+                tuple(name for name, _ in st.session_state.file_index),
+                tuple(st.session_state.main_files)
+            )
             cols = st.columns(2)
             for i, suggestion in enumerate(suggestions):
                 with cols[i % 2]:
                     if st.button(suggestion, key=f"suggestion_{i}"):
-                        # Add suggestion as user message and get response
-                        user_message = {"role": "user", "content": suggestion}
-                        st.session_state.messages.append(user_message)
-                        st.session_state.conversation_history.append(user_message)
-                        
-                        with st.spinner("Getting response..."):
-                            response = chat_with_repository(
-                                suggestion,
-                                st.session_state.repository,
-                                st.session_state.documentation,
-                                st.session_state.conversation_history
-                            )
-                            
-                            if response:
-                                assistant_message = {"role": "assistant", "content": response}
-                                st.session_state.messages.append(assistant_message)
-                                st.session_state.conversation_history.append(assistant_message)
-                        
-                        st.rerun()
-        
-        # Chat messages display
-        chat_container = st.container()
-        with chat_container:
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"]):
-                    st.markdown(message["content"])
-        
-        # Chat input
-        if prompt := st.chat_input("Ask a question about this repository..."):
-            # Add user message
-            user_message = {"role": "user", "content": prompt}
-            st.session_state.messages.append(user_message)
-            st.session_state.conversation_history.append(user_message)
-            
-            # Display user message
-            with st.chat_message("user"):
-                st.markdown(prompt)
-            
-            # Get and display assistant response
-            with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = chat_with_repository(
-                        prompt,
-                        st.session_state.repository,
-                        st.session_state.documentation,
-                        st.session_state.conversation_history
-                    )
-                    
-                    if response:
-                        st.markdown(response)
-                        assistant_message = {"role": "assistant", "content": response}
-                        st.session_state.messages.append(assistant_message)
-                        st.session_state.conversation_history.append(assistant_message)
-                    else:
-                        st.error("Sorry, I couldn't process your question. Please try again.")
+                        # Queue instead of sending; clicks that arrive while
+                        # a flush is in flight go out together next rerun
+                        st.session_state.pending.append(suggestion)
+
+        # Flush queued suggested questions as one batched call
+        if st.session_state.pending:
+            batch = st.session_state.pending
+            st.session_state.pending = []
+
+            with st.spinner("Getting response..."):
+                replies = chat_with_repository_batch(batch)
+
+            # History is maintained inside the batch helper; only the
+            # display transcript is updated here
+            for i, question in enumerate(batch):
+                st.session_state.messages.append({"role": "user", "content": question})
+                if i < len(replies):
+                    st.session_state.messages.append({"role": "assistant", "content": replies[i]})
+
+            st.rerun()
         
-        # Clear chat button
-        if st.session_state.messages:
-            if st.button("🗑️ Clear Chat"):
-                st.session_state.messages = []
-                st.session_state.conversation_history = []
-                st.rerun()
+        # Chat messages, input and clear button (fragment: reruns alone)
+        render_chat()
     
     else:
         st.info("👆 Generate documentation first to start chatting about the repository")